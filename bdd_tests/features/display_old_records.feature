@@ -97,3 +97,23 @@ Feature: Ability to display old records
           | 5d5892d4-1f74-4ccf-91af-548dfc9767ab |
      When I delete all tables from database
      Then I should find that the database is empty
+
+
+  Scenario: Read old records from database filled-in by test data
+    Given the system is in default state
+      And the database is named test
+      And database user is set to postgres
+      And database password is set to postgres
+      And database connection is established
+      And the database is empty
+     When I prepare database schema
+     Then I should find that all tables are empty
+     When I fill in the database by test data
+      And I run the cleaner to display all records older than 90 days
+     Then I should see the following clusters
+          | cluster name                         |
+          | 00000000-0000-0000-0000-000000000000 |
+          | 11111111-1111-1111-1111-111111111111 |
+          | 5d5892d4-1f74-4ccf-91af-548dfc9767aa |
+     When I delete all tables from database
+     Then I should find that the database is empty
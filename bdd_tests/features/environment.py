@@ -0,0 +1,174 @@
+# Copyright © 2021 Pavel Tisnovsky, Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Hooks called by behave before and after scenarios and the whole test run."""
+
+import json
+import os
+import subprocess
+
+from psycopg2 import sql
+from psycopg2.pool import SimpleConnectionPool
+
+
+class CleanerServer:
+    """Insights Aggregator Cleaner started in server mode and shared by all test steps."""
+
+    def __init__(self, executable, log_file):
+        """Initialize the object, the cleaner itself is started on first request."""
+        self.executable = executable
+        self.log_file = log_file
+        self.log = None
+        self.process = None
+
+    def request(self, **command):
+        """Send one command to the cleaner and wait for its reply."""
+        if self.process is None:
+            # standard output is used for replies, other messages are written
+            # into log file to be available when the cleaner fails
+            if self.log is None:
+                self.log = open(self.log_file, "w")
+            self.process = subprocess.Popen([self.executable, "--serve"],
+                                            stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE,
+                                            stderr=self.log,
+                                            bufsize=1,
+                                            universal_newlines=True,
+                                            close_fds=False)
+
+        self.process.stdin.write(json.dumps(command) + "\n")
+        self.process.stdin.flush()
+
+        # exactly one reply is written for each command
+        reply = self.process.stdout.readline()
+        if reply == "":
+            # the cleaner has terminated, it will be started again on next request
+            self.process.stdin.close()
+            return_code = self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+            raise AssertionError("Cleaner in server mode terminated unexpectedly with "
+                                 "return code {}, see {}".format(return_code, self.log_file))
+        return json.loads(reply)
+
+    def close(self):
+        """Stop the cleaner, if it has been started."""
+        if self.process is not None:
+            # the cleaner finishes when EOF is reached on its standard input
+            self.process.stdin.close()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+
+def execute_on_pool(pool, query):
+    """Execute one query on connection taken from pool and commit it."""
+    connection = pool.getconn()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query)
+        connection.commit()
+    finally:
+        pool.putconn(connection)
+
+
+def create_schema(pool, schema):
+    """Create schema used by this process only (when tests are run in parallel)."""
+    execute_on_pool(pool, sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(schema)))
+
+
+def drop_schema(pool, schema):
+    """Drop schema used by this process together with all tables in it."""
+    execute_on_pool(pool, sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+
+
+def create_db_pool(context, connection_string):
+    """Create pool of connections to database, it is closed in after_all."""
+    # steps are run in one thread (and parallel test runs use separate
+    # processes), so the pool does not need any locking
+    pool = SimpleConnectionPool(1, 8, connection_string)
+    if context.db_schema is not None:
+        create_schema(pool, context.db_schema)
+    return pool
+
+
+def before_all(context):
+    """Perform setup before the whole test run."""
+    # each process running tests (there are more of them when tests are run
+    # in parallel by behavex) needs its own file with cleaner output
+    context.test_output = "test-{}".format(os.getpid())
+
+    # the cleaner can be started for each step separately by specifying
+    # -D cleaner_server=false on command line; messages from the cleaner
+    # started in server mode are written into log file next to its output
+    if context.config.userdata.getbool("cleaner_server", True):
+        context.cleaner_server = CleanerServer("insights-results-aggregator-cleaner",
+                                               "cleaner-server-{}.log".format(os.getpid()))
+    else:
+        context.cleaner_server = None
+
+    # pools of connections to database, one pool for each connection string;
+    # they are created by test steps on first use
+    context.db_pools = {}
+    context.create_db_pool = lambda connection_string: create_db_pool(context, connection_string)
+
+    # tables created by tests can be isolated in schema used by this process
+    # only, which is needed when tests are run in parallel; it is enabled by
+    # specifying -D isolated_schema=true on command line
+    if context.config.userdata.getbool("isolated_schema", False):
+        context.db_schema = "test_{}".format(os.getpid())
+        # search path is used by all connections to database, including
+        # connections made by the cleaner itself; options that are already
+        # set are kept and restored in after_all (behavex calls before_all
+        # for each feature in the same process)
+        context.original_pgoptions = os.environ.get("PGOPTIONS")
+        options = "-c search_path={}".format(context.db_schema)
+        if context.original_pgoptions:
+            options = context.original_pgoptions + " " + options
+        os.environ["PGOPTIONS"] = options
+    else:
+        context.db_schema = None
+
+
+def after_scenario(context, scenario):
+    """Perform cleanup after each scenario."""
+    # return connection to database that has not been closed by test steps
+    if getattr(context, "connection", None) is not None:
+        # the pool itself rolls back unfinished transaction and discards
+        # closed or broken connection
+        context.db_pool.putconn(context.connection)
+        context.connection = None
+
+
+def after_all(context):
+    """Perform cleanup after the whole test run."""
+    if context.cleaner_server is not None:
+        context.cleaner_server.close()
+
+    if os.path.exists(context.test_output):
+        os.remove(context.test_output)
+
+    for pool in context.db_pools.values():
+        if context.db_schema is not None:
+            drop_schema(pool, context.db_schema)
+        pool.closeall()
+
+    if context.db_schema is not None:
+        if context.original_pgoptions is None:
+            del os.environ["PGOPTIONS"]
+        else:
+            os.environ["PGOPTIONS"] = context.original_pgoptions
@@ -14,46 +14,100 @@
 
 """Implementation of test steps that run Insights Aggregator Cleaner and check its output."""
 
+import os
 import subprocess
 
-# default name of file generated by Insights Aggregator Cleaner during testing
-test_output = "test"
+# help message displayed by cleaner, tabs are replaced by spaces and
+# leading/trailing whitespaces are removed before the comparison
+expected_help_output = """
+Usage of insights-results-aggregator-cleaner:
+  -authors
+        show authors
+  -cleanup
+        perform database cleanup
+  -clusters string
+        list of clusters to cleanup
+  -fill-in-db
+        fill-in database by test data
+  -max-age string
+        max age for displaying old records
+  -multiple-rule-disable
+        list clusters with the same rule(s) disabled by different users
+  -output string
+        filename for old cluster listing
+  -serve
+        read commands from standard input and perform them
+  -summary
+        print summary table after cleanup
+  -version
+        show cleaner version""".strip()
+
+
+def start_cleaner(arguments, capture_stdout=True):
+    """Start the cleaner with given command line arguments.
+
+    When capture_stdout is False, the output of cleaner is thrown away, which
+    is useful when results are written into file.
+
+    File descriptors are not closed in child process, because it would mean
+    to try to close all descriptors up to the limit, which is slow when the
+    limit is high (for example in containers). Descriptors opened by Python
+    are not inheritable by default, so no descriptor is leaked this way.
+    """
+    if capture_stdout:
+        return subprocess.Popen(["insights-results-aggregator-cleaner"] + arguments,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT,
+                                close_fds=False)
+
+    return subprocess.Popen(["insights-results-aggregator-cleaner"] + arguments,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                            close_fds=False)
 
 
 def process_cleaner_output(context, out, return_code):
-    """Process cleaner output."""
+    """Process cleaner output.
+
+    Output is kept as raw bytes, test steps that need text decode it by
+    themselves. Nothing is read when the output has not been captured.
+    """
     assert out is not None
 
     # interact with the process:
-    # read data from stdout and stderr, until end-of-file is reached
-    stdout, stderr = out.communicate()
-
-    # basic checks
-    assert stderr is None, "Error during check"
-    assert stdout is not None, "No output from cleaner"
+    # read data from stdout (stderr is redirected there), until end-of-file is reached
+    stdout = None
+    if out.stdout is not None:
+        stdout = out.stdout.read()
+        out.stdout.close()
+    out.wait()
 
     # check the return code of a process
     assert out.returncode == 0 or out.returncode == return_code, \
         "Return code is {}".format(out.returncode)
 
-    # try to decode output
-    output = stdout.decode('utf-8').split("\n")
-
-    assert output is not None
-
     # update testing context
-    context.output = output
     context.stdout = stdout
-    context.stderr = stderr
+
+
+def request_cleaner_server(context, **command):
+    """Let the cleaner running in server mode perform the command."""
+    reply = context.cleaner_server.request(**command)
+
+    assert reply is not None, "No reply from cleaner"
+    assert reply["status"] == "ok", "Command failed: {}".format(reply.get("error"))
 
 
 @when(u"I run the cleaner to display all records older than {age}")
 def run_cleaner_for_older_records(context, age):
     """Start the cleaner to retrieve list of older records."""
-    out = subprocess.Popen(["insights-results-aggregator-cleaner", "--output", test_output,
-                            "--max-age", age],
-                           stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT)
+    if context.cleaner_server is not None:
+        request_cleaner_server(context, op="display", max_age=age, output=context.test_output)
+        return
+
+    # results are written into file, so the output is not needed
+    out = start_cleaner(["--output", context.test_output, "--max-age", age],
+                        capture_stdout=False)
 
     assert out is not None
     process_cleaner_output(context, out, 0)
@@ -62,9 +116,7 @@ def run_cleaner_for_older_records(context, age):
 @when(u"I run the cleaner with the {flag} command line flag")
 def run_cleaner_with_flag(context, flag):
     """Start the cleaner with given command-line flag."""
-    out = subprocess.Popen(["insights-results-aggregator-cleaner", flag],
-                           stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT)
+    out = start_cleaner([flag])
 
     assert out is not None
     process_cleaner_output(context, out, 2)
@@ -73,10 +125,26 @@ def run_cleaner_with_flag(context, flag):
 @when(u"I run the cleaner with command to delete cluster {cluster}")
 def run_cleaner_to_cleanup_cluster(context, cluster):
     """Start the cleaner clean up given cluster."""
-    out = subprocess.Popen(["insights-results-aggregator-cleaner", "--cleanup",
-                            "--clusters", cluster],
-                           stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT)
+    if context.cleaner_server is not None:
+        request_cleaner_server(context, op="cleanup", clusters=cluster)
+        return
+
+    # output is not checked by any test step
+    out = start_cleaner(["--cleanup", "--clusters", cluster], capture_stdout=False)
+
+    assert out is not None
+    process_cleaner_output(context, out, 0)
+
+
+@when(u"I fill in the database by test data")
+def run_cleaner_to_fill_in_database(context):
+    """Start the cleaner to fill-in database by test data."""
+    if context.cleaner_server is not None:
+        request_cleaner_server(context, op="fill-in-db")
+        return
+
+    # output is not checked by any test step
+    out = start_cleaner(["--fill-in-db"], capture_stdout=False)
 
     assert out is not None
     process_cleaner_output(context, out, 0)
@@ -85,27 +153,6 @@ def run_cleaner_to_cleanup_cluster(context, cluster):
 @then(u"I should see help messages displayed on standard output")
 def check_help_from_cleaner(context):
     """Check if help is displayed by cleaner."""
-    expected_output = """
-Usage of insights-results-aggregator-cleaner:
-  -authors
-        show authors
-  -cleanup
-        perform database cleanup
-  -clusters string
-        list of clusters to cleanup
-  -fill-in-db
-        fill-in database by test data
-  -max-age string
-        max age for displaying old records
-  -multiple-rule-disable
-        list clusters with the same rule(s) disabled by different users
-  -output string
-        filename for old cluster listing
-  -summary
-        print summary table after cleanup
-  -version
-        show cleaner version"""
-
     assert context.stdout is not None
     stdout = context.stdout.decode("utf-8").replace("\t", "    ")
 
@@ -114,39 +161,38 @@ Usage of insights-results-aggregator-cleaner:
     assert type(stdout) is str, "wrong type of stdout object"
 
     # check the output
-    assert stdout.strip() == expected_output.strip(), "{} != {}".format(stdout, expected_output)
+    assert stdout.strip() == expected_help_output, "{} != {}".format(stdout, expected_help_output)
 
 
 @then(u"I should see version info displayed on standard output")
 def check_version_from_cleaner(context):
     """Check if version info is displayed by cleaner."""
     # preliminary checks
-    assert context.output is not None
-    assert type(context.output) is list, "wrong type of output"
+    assert context.stdout is not None
+    assert type(context.stdout) is bytes, "wrong type of output"
 
-    # check the output
-    assert "Insights Results Aggregator Cleaner version 1.0" in context.output, \
-        "Caught output: {}".format(context.output)
+    # check the output (no need to decode it)
+    assert b"Insights Results Aggregator Cleaner version 1.0\n" in context.stdout, \
+        "Caught output: {}".format(context.stdout)
 
 
 @then(u"I should see info about authors displayed on standard output")
 def check_authors_info_from_cleaner(context):
     """Check if information about authors is displayed by cleaner."""
     # preliminary checks
-    assert context.output is not None
-    assert type(context.output) is list, "wrong type of output"
+    assert context.stdout is not None
+    assert type(context.stdout) is bytes, "wrong type of output"
 
-    # check the output
-    assert "Pavel Tisnovsky, Red Hat Inc." in context.output, \
-        "Caught output: {}".format(context.output)
+    # check the output (no need to decode it)
+    assert b"Pavel Tisnovsky, Red Hat Inc.\n" in context.stdout, \
+        "Caught output: {}".format(context.stdout)
 
 
 @then(u"I should see empty list of records")
 def check_empty_list_of_records(context):
     """Check if the cleaner displays empty list of records."""
-    with open(test_output, "r") as fin:
-        content = fin.read()
-        assert content == "", "expecting empty list of clusters"
+    # file size is enough to check that the file is empty
+    assert os.stat(context.test_output).st_size == 0, "expecting empty list of clusters"
 
 
 @then(u"I should see the following clusters")
@@ -158,7 +204,7 @@ def check_non_empty_list_of_records(context):
     # set of actually found clusters
     found_clusters = set()
 
-    with open(test_output, "r") as fin:
+    with open(context.test_output, "r") as fin:
         assert fin is not None
         for line in fin:
             assert line is not None
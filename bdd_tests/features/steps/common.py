@@ -12,14 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+from functools import lru_cache
 from shutil import which
-import psycopg2
-from psycopg2.errors import UndefinedTable
 
 
 from behave import given, then, when
 
 
+@lru_cache(maxsize=64)
+def cached_which(filename, path):
+    """Try to find given executable file on given PATH, results are cached."""
+    return which(filename, path=path)
+
+
 @given(u"the system is in default state")
 def system_in_default_state(context):
     """Check the default system state."""
@@ -30,7 +36,8 @@ def system_in_default_state(context):
 def look_for_executable_file(context, filename):
     """Try to find given executable file on PATH."""
     context.filename = filename
-    context.found = which(filename)
+    # PATH is part of cache key, so its changes are taken into account
+    context.found = cached_which(filename, os.environ.get("PATH"))
 
 
 @then(u"I should find that file on PATH")
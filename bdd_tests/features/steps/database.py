@@ -14,8 +14,7 @@
 
 """Database-related operations performed by BDD tests."""
 
-import psycopg2
-from psycopg2.errors import UndefinedTable
+from psycopg2 import sql
 
 
 from behave import given, then, when
@@ -80,12 +79,39 @@ CREATE TABLE rule_hit (
                         );
 """
 
+# all tables created and used by tests
+DATA_TABLES = ("report",
+               "cluster_rule_toggle",
+               "cluster_rule_user_feedback",
+               "cluster_user_rule_disable_feedback",
+               "rule_hit")
+
+
+def get_connection(context, connection_string):
+    """Take connection to database from pool, the pool is created on first use.
+
+    The connection is taken once per scenario and it is used by all its
+    steps; it is returned to the pool after the scenario.
+    """
+    pool = context.db_pools.get(connection_string)
+    if pool is None:
+        pool = context.create_db_pool(connection_string)
+        context.db_pools[connection_string] = pool
+
+    # connection already taken by this scenario needs to be returned first
+    if getattr(context, "connection", None) is not None:
+        context.db_pool.putconn(context.connection)
+
+    # the connection needs to be returned to the same pool
+    context.db_pool = pool
+    context.connection = pool.getconn()
+
 
 @when(u"I connect to database named {database} as user {user} with password {password}")
 def connect_to_database(context, database, user, password):
     """Perform connection to selected database."""
     connection_string = "dbname={} user={} password={}".format(database, user, password)
-    context.connection = psycopg2.connect(connection_string)
+    get_connection(context, connection_string)
 
 
 @then(u"I should be able to connect to such database")
@@ -97,7 +123,7 @@ def check_connection(context):
 @when(u"I close database connection")
 def disconnect_from_database(context):
     """Close the connection to database."""
-    context.connection.close()
+    context.db_pool.putconn(context.connection)
     context.connection = None
 
 
@@ -110,15 +136,10 @@ def check_disconnection(context):
 @when(u"I look for the table {table} in database")
 def look_for_table(context, table):
     """Try to find a table in database."""
+    # catalog lookup only, no need to read from the table itself
     cursor = context.connection.cursor()
-    try:
-        cursor.execute("SELECT 1 from {}".format(table))
-        v = cursor.fetchone()
-        context.table_found = True
-    except UndefinedTable as e:
-        context.table_found = False
-
-    context.connection.commit()
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    context.table_found = cursor.fetchone()[0]
 
 
 @then(u"I should not be able to find it")
@@ -157,7 +178,7 @@ def establish_connection_to_database(context):
     connection_string = "dbname={} user={} password={}".format(context.database_name,
                                                                context.database_user,
                                                                context.database_password)
-    context.connection = psycopg2.connect(connection_string)
+    get_connection(context, connection_string)
     assert context.connection is not None, "connection should be established"
 
 
@@ -166,44 +187,43 @@ def establish_connection_to_database(context):
 def ensure_database_emptiness(context):
     """Perform check if the database is empty."""
     # at least following tables should not exists
-    tables = ("report",
-              "cluster_rule_toggle",
-              "cluster_rule_user_feedback",
-              "cluster_user_rule_disable_feedback",
-              "rule_hit")
-
+    # (all of them are looked up by one query)
     cursor = context.connection.cursor()
-    for table in tables:
-        try:
-            cursor.execute("SELECT 1 from {}".format(table))
-            v = cursor.fetchone()
-            context.connection.commit()
-            raise Exception("Table '{}' exists".format(table))
-        except UndefinedTable as e:
-            # exception means that the table does not exists
-            context.connection.rollback()
-            pass
+    try:
+        cursor.execute("""SELECT table_name FROM information_schema.tables
+                           WHERE table_schema = ANY(current_schemas(false))
+                             AND table_name = ANY(%s)""", (list(DATA_TABLES),))
+        existing_tables = [row[0] for row in cursor.fetchall()]
+    finally:
+        # nothing has been changed, and connection needs to be usable even
+        # if the query failed
+        context.connection.rollback()
+
+    assert not existing_tables, "Tables {} exist".format(existing_tables)
 
 
 @then(u"I should find that all tables are empty")
 def ensure_data_tables_emptiness(context):
     """Perform check if data tables are empty."""
     # following tables should be empty
-    tables = ("report",
-              "cluster_rule_toggle",
-              "cluster_rule_user_feedback",
-              "cluster_user_rule_disable_feedback",
-              "rule_hit")
+    # (number of records in all tables is read by one query)
+    query = sql.SQL(" UNION ALL ").join(
+        sql.SQL("SELECT {}, count(*) FROM {}").format(sql.Literal(table), sql.Identifier(table))
+        for table in DATA_TABLES)
 
-    for table in tables:
-        cursor = context.connection.cursor()
-        try:
-            cursor.execute("SELECT count(*) as cnt from {}".format(table))
-            results = cursor.fetchone()
-            assert len(results) == 1, "Wrong number of records returned: {}".format(len(results))
-            assert results[0] == 0, "Table '{}' is not empty as expected".format(table)
-        except Exception as e:
-            raise e
+    cursor = context.connection.cursor()
+    try:
+        cursor.execute(query)
+        results = cursor.fetchall()
+    finally:
+        # nothing has been changed, and connection needs to be usable even
+        # if some table does not exist
+        context.connection.rollback()
+
+    assert len(results) == len(DATA_TABLES), \
+        "Wrong number of records returned: {}".format(len(results))
+    for table, count in results:
+        assert count == 0, "Table '{}' is not empty as expected".format(table)
 
 
 @when(u"I prepare database schema")
@@ -230,16 +250,10 @@ def prepare_database_schema(context):
 def delete_all_tables(context):
     """Delete all relevant tables from database."""
     # following tables should be deleted
-    tables = ("report",
-              "cluster_rule_toggle",
-              "cluster_rule_user_feedback",
-              "cluster_user_rule_disable_feedback",
-              "rule_hit")
-
-    for table in tables:
+    for table in DATA_TABLES:
         cursor = context.connection.cursor()
         try:
-            cursor.execute("DROP TABLE {}".format(table))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(table)))
             context.connection.commit()
         except Exception as e:
             context.connection.rollback()
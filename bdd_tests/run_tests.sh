@@ -9,5 +9,18 @@ function prepare_venv() {
 
 [ "$NOVENV" == "1" ] || prepare_venv || exit 1
 
-PYTHONDONTWRITEBYTECODE=1 python3 "`which behave`" --tags=-skip -D dump_errors=true @feature_list.txt $@
+if [ "$PARALLEL" == "1" ]
+then
+    # features are run in parallel, each process uses its own database schema;
+    # behavex calls before_all and after_all hooks for each feature, so the
+    # cleaner in server mode and the schema are shared by scenarios of one
+    # feature only (with --parallel-scheme=scenario they would be prepared
+    # again for each scenario)
+    # shellcheck disable=SC2046
+    PYTHONDONTWRITEBYTECODE=1 python3 "`which behavex`" --tags=-skip -D dump_errors=true \
+        -D isolated_schema=true --parallel-scheme=feature --parallel-processes="$(nproc)" \
+        $(cat feature_list.txt) "$@"
+else
+    PYTHONDONTWRITEBYTECODE=1 python3 "`which behave`" --tags=-skip -D dump_errors=true @feature_list.txt $@
+fi
 
@@ -40,8 +40,10 @@ package main
 
 import (
 	"bufio"
+	"encoding/json"
 	"flag"
 	"fmt"
+	"io"
 	"os"
 	"strconv"
 	"strings"
@@ -74,6 +76,20 @@ const (
 	selectingRecordsFromDatabase = "Selecting records from database"
 )
 
+// Operations that can be requested in server mode
+const (
+	displayOperation             = "display"
+	cleanupOperation             = "cleanup"
+	multipleRuleDisableOperation = "multiple-rule-disable"
+	fillInDatabaseOperation      = "fill-in-db"
+)
+
+// Statuses written into replies in server mode
+const (
+	statusOk    = "ok"
+	statusError = "error"
+)
+
 // IsValidUUID function checks if provided string contains a correct UUID.
 func IsValidUUID(input string) bool {
 	_, err := uuid.Parse(input)
@@ -263,6 +279,86 @@ func doSelectedOperation(config ConfigStruct, connection *sql.DB,
 	// we should not end there
 }
 
+// performCommand function performs one command received in server mode
+func performCommand(config ConfigStruct, connection *sql.DB, command Command) error {
+	switch command.Operation {
+	case displayOperation:
+		// override default value read from configuration file
+		maxAge := config.Cleaner.MaxAge
+		if command.MaxAge != "" {
+			maxAge = command.MaxAge
+		}
+		return displayAllOldRecords(connection, maxAge, command.Output)
+	case cleanupOperation:
+		clusterList, _, err := readClusterList(config.Cleaner.ClusterListFile, command.Clusters)
+		if err != nil {
+			return err
+		}
+		_, err = performCleanupInDB(connection, clusterList)
+		return err
+	case multipleRuleDisableOperation:
+		return displayMultipleRuleDisable(connection, command.Output)
+	case fillInDatabaseOperation:
+		// failure is usually ok - it might mean that the records
+		// already exist (the same behaviour as -fill-in-db option)
+		err := fillInDatabaseByTestData(connection)
+		if err != nil {
+			log.Warn().Err(err).Msg("Fill-in database by test data")
+		}
+		return nil
+	default:
+		return fmt.Errorf("unknown operation '%s'", command.Operation)
+	}
+}
+
+// reserveStdoutForReplies function is used in server mode only. It returns
+// file that is to be used to write replies (it is the original standard
+// output) and redirects all other messages written via os.Stdout (for
+// example messages printed during configuration loading) to standard error
+// output, so they can't be mixed with replies. It must be called before
+// anything is written to standard output. The original file object is
+// returned instead of opening descriptor 1 again, because the original
+// object would close that descriptor when garbage collected.
+func reserveStdoutForReplies() *os.File {
+	replies := os.Stdout
+	os.Stdout = os.Stderr
+	return replies
+}
+
+// serveCommands function reads commands from given reader (one JSON object
+// per line), performs them, and writes one reply (again JSON object on
+// separate line) for each command into given writer. It is possible to
+// perform many operations using just one cleaner process this way, i.e. to
+// load configuration and to connect to database just once.
+func serveCommands(config ConfigStruct, connection *sql.DB,
+	reader io.Reader, writer io.Writer) error {
+	scanner := bufio.NewScanner(reader)
+	encoder := json.NewEncoder(writer)
+
+	// commands are read until EOF is reached
+	for scanner.Scan() {
+		var command Command
+
+		err := json.Unmarshal(scanner.Bytes(), &command)
+		if err == nil {
+			err = performCommand(config, connection, command)
+		}
+
+		reply := Reply{Status: statusOk}
+		if err != nil {
+			log.Err(err).Str("operation", command.Operation).Msg("Command failed")
+			reply = Reply{Status: statusError, Error: err.Error()}
+		}
+
+		// one reply needs to be written for each command
+		err = encoder.Encode(reply)
+		if err != nil {
+			return err
+		}
+	}
+	return scanner.Err()
+}
+
 func main() {
 	var performCleanup bool
 	var printSummaryTable bool
@@ -270,6 +366,7 @@ func main() {
 	var fillInDatabase bool
 	var showVersion bool
 	var showAuthors bool
+	var serve bool
 	var maxAge string
 	var clusters string
 	var output string
@@ -281,11 +378,18 @@ func main() {
 	flag.BoolVar(&fillInDatabase, "fill-in-db", false, "fill-in database by test data")
 	flag.BoolVar(&showVersion, "version", false, "show cleaner version")
 	flag.BoolVar(&showAuthors, "authors", false, "show authors")
+	flag.BoolVar(&serve, "serve", false, "read commands from standard input and perform them")
 	flag.StringVar(&maxAge, "max-age", "", "max age for displaying old records")
 	flag.StringVar(&clusters, "clusters", "", "list of clusters to cleanup")
 	flag.StringVar(&output, "output", "", "filename for old cluster listing")
 	flag.Parse()
 
+	// in server mode standard output is reserved for replies
+	var replies *os.File
+	if serve {
+		replies = reserveStdoutForReplies()
+	}
+
 	// config has exactly the same structure as *.toml file
 	config, err := LoadConfiguration(configFileEnvVariableName, defaultConfigFileName)
 	if err != nil {
@@ -309,6 +413,16 @@ func main() {
 		log.Err(err).Msg("Connection to database not established")
 	}
 
+	// perform commands read from standard input
+	if serve {
+		err = serveCommands(config, connection, os.Stdin, replies)
+		if err != nil {
+			log.Err(err).Msg("Server mode failed")
+		}
+		log.Debug().Msg("Finished")
+		return
+	}
+
 	// perform selected operation
 	err = doSelectedOperation(config, connection, showVersion, showAuthors,
 		performCleanup, detectMultipleRuleDisable, fillInDatabase,
@@ -20,8 +20,229 @@ package main_test
 // https://redhatinsights.github.io/insights-results-aggregator-cleaner/packages/cleaner_test.html
 
 import (
+	"bytes"
+	"errors"
+	"strings"
 	"testing"
+
+	"github.com/DATA-DOG/go-sqlmock"
+	cleaner "github.com/RedHatInsights/insights-results-aggregator-cleaner"
 )
 
 func TestX(t *testing.T) {
 }
+
+// TestServeCommandsImproperCommand checks how improper command is handled in
+// server mode.
+func TestServeCommandsImproperCommand(t *testing.T) {
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+	mock.ExpectClose()
+
+	input := strings.NewReader("this is not a JSON\n")
+	output := new(bytes.Buffer)
+
+	// call the tested function
+	err = cleaner.ServeCommands(cleaner.ConfigStruct{}, connection, input, output)
+	if err != nil {
+		t.Errorf("error was not expected while serving commands: %s", err)
+	}
+
+	// check the reply
+	reply := output.String()
+	if !strings.HasPrefix(reply, `{"status":"error","error":`) {
+		t.Errorf("wrong reply: %s", reply)
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
+
+// TestServeCommandsUnknownOperation checks how unknown operation is handled
+// in server mode.
+func TestServeCommandsUnknownOperation(t *testing.T) {
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+	mock.ExpectClose()
+
+	input := strings.NewReader(`{"op": "foo"}` + "\n")
+	output := new(bytes.Buffer)
+
+	// call the tested function
+	err = cleaner.ServeCommands(cleaner.ConfigStruct{}, connection, input, output)
+	if err != nil {
+		t.Errorf("error was not expected while serving commands: %s", err)
+	}
+
+	// check the reply
+	expectedReply := `{"status":"error","error":"unknown operation 'foo'"}` + "\n"
+	if output.String() != expectedReply {
+		t.Errorf("wrong reply: %s", output.String())
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
+
+// TestServeCommandsDisplayAndCleanup checks that more commands can be
+// performed in server mode and that one reply is written for each command.
+func TestServeCommandsDisplayAndCleanup(t *testing.T) {
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+
+	// prepare mocked result for SQL query
+	rows := sqlmock.NewRows([]string{"cluster", "reported_at", "last_checked_at"})
+
+	// expected query and statements performed by tested function
+	expectedQuery := "SELECT cluster, reported_at, last_checked_at FROM report WHERE reported_at < NOW\\(\\) - \\$1::INTERVAL ORDER BY reported_at"
+	mock.ExpectQuery(expectedQuery).WithArgs("10 days").WillReturnRows(rows)
+	mock.ExpectExec("DELETE FROM cluster_rule_toggle WHERE cluster_id = \\$1;").WillReturnResult(sqlmock.NewResult(1, 1))
+	mock.ExpectExec("DELETE FROM cluster_rule_user_feedback WHERE cluster_id = \\$1;").WillReturnResult(sqlmock.NewResult(1, 1))
+	mock.ExpectExec("DELETE FROM cluster_user_rule_disable_feedback WHERE cluster_id = \\$1;").WillReturnResult(sqlmock.NewResult(1, 1))
+	mock.ExpectExec("DELETE FROM rule_hit WHERE cluster_id = \\$1;").WillReturnResult(sqlmock.NewResult(1, 1))
+	mock.ExpectExec("DELETE FROM report WHERE cluster = \\$1;").WillReturnResult(sqlmock.NewResult(1, 1))
+	mock.ExpectClose()
+
+	input := strings.NewReader(`{"op": "display", "max_age": "10 days"}` + "\n" +
+		`{"op": "cleanup", "clusters": "5d5892d4-1f74-4ccf-91af-548dfc9767aa"}` + "\n")
+	output := new(bytes.Buffer)
+
+	// call the tested function
+	err = cleaner.ServeCommands(cleaner.ConfigStruct{}, connection, input, output)
+	if err != nil {
+		t.Errorf("error was not expected while serving commands: %s", err)
+	}
+
+	// check the replies
+	expectedReplies := `{"status":"ok"}` + "\n" + `{"status":"ok"}` + "\n"
+	if output.String() != expectedReplies {
+		t.Errorf("wrong replies: %s", output.String())
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
+
+// TestServeCommandsMultipleRuleDisable checks that clusters with rules
+// disabled by multiple users can be displayed in server mode.
+func TestServeCommandsMultipleRuleDisable(t *testing.T) {
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+
+	// expected queries performed by tested function
+	expectedQuery1 := "select cluster_id, rule_id, count\\(\\*\\) as cnt from cluster_rule_toggle"
+	expectedQuery2 := "select cluster_id, rule_id, count\\(\\*\\) as cnt from cluster_user_rule_disable_feedback"
+	mock.ExpectQuery(expectedQuery1).WillReturnRows(sqlmock.NewRows([]string{}))
+	mock.ExpectQuery(expectedQuery2).WillReturnRows(sqlmock.NewRows([]string{}))
+	mock.ExpectClose()
+
+	input := strings.NewReader(`{"op": "multiple-rule-disable"}` + "\n")
+	output := new(bytes.Buffer)
+
+	// call the tested function
+	err = cleaner.ServeCommands(cleaner.ConfigStruct{}, connection, input, output)
+	if err != nil {
+		t.Errorf("error was not expected while serving commands: %s", err)
+	}
+
+	// check the reply
+	expectedReply := `{"status":"ok"}` + "\n"
+	if output.String() != expectedReply {
+		t.Errorf("wrong reply: %s", output.String())
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
+
+// TestServeCommandsFillInDB checks that database can be filled-in by test
+// data in server mode and that insert failures are not reported as errors
+// (the same behaviour as -fill-in-db command line option).
+func TestServeCommandsFillInDB(t *testing.T) {
+	// error to be thrown
+	mockedError := errors.New("mocked error")
+
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+
+	// expected statements performed by tested function: five inserts for
+	// each of three clusters, the first one fails
+	mock.ExpectExec("INSERT INTO report").WillReturnError(mockedError)
+	for i := 1; i < 15; i++ {
+		mock.ExpectExec("INSERT INTO").WillReturnResult(sqlmock.NewResult(1, 1))
+	}
+	mock.ExpectClose()
+
+	input := strings.NewReader(`{"op": "fill-in-db"}` + "\n")
+	output := new(bytes.Buffer)
+
+	// call the tested function
+	err = cleaner.ServeCommands(cleaner.ConfigStruct{}, connection, input, output)
+	if err != nil {
+		t.Errorf("error was not expected while serving commands: %s", err)
+	}
+
+	// check the reply
+	expectedReply := `{"status":"ok"}` + "\n"
+	if output.String() != expectedReply {
+		t.Errorf("wrong reply: %s", output.String())
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
@@ -125,8 +125,10 @@ func displayMultipleRuleDisable(connection *sql.DB, output string) error {
 	var writer *bufio.Writer = nil
 
 	if output != "" {
-		// create output file
-		fout, err := os.Create(output)
+		var err error
+		// create output file (the variable fout must not be shadowed
+		// there, otherwise the file won't be closed)
+		fout, err = os.Create(output)
 		if err != nil {
 			log.Error().Err(err).Msg(fileOpenMsg)
 		}
@@ -143,10 +145,8 @@ func displayMultipleRuleDisable(connection *sql.DB, output string) error {
 				log.Error().Err(err).Msg(flushWriterMsg)
 			}
 		}
-	}()
-
-	defer func() {
-		// file needs to be closed at the end
+		// file needs to be closed at the end, but after the output
+		// has been flushed
 		if fout != nil {
 			err := fout.Close()
 			if err != nil {
@@ -283,8 +283,10 @@ func displayAllOldRecords(connection *sql.DB, maxAge string, output string) erro
 	var writer *bufio.Writer = nil
 
 	if output != "" {
-		// create output file
-		fout, err := os.Create(output)
+		var err error
+		// create output file (the variable fout must not be shadowed
+		// there, otherwise the file won't be closed)
+		fout, err = os.Create(output)
 		if err != nil {
 			log.Error().Err(err).Msg(fileOpenMsg)
 		}
@@ -301,10 +303,8 @@ func displayAllOldRecords(connection *sql.DB, maxAge string, output string) erro
 				log.Error().Err(err).Msg(flushWriterMsg)
 			}
 		}
-	}()
-
-	defer func() {
-		// file needs to be closed at the end
+		// file needs to be closed at the end, but after the output
+		// has been flushed
 		if fout != nil {
 			err := fout.Close()
 			if err != nil {
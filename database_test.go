@@ -21,6 +21,9 @@ package main_test
 
 import (
 	"errors"
+	"io/ioutil"
+	"os"
+	"strings"
 	"testing"
 	"time"
 
@@ -354,6 +357,71 @@ func TestPerformListOfOldReportsOnError(t *testing.T) {
 	}
 }
 
+// TestDisplayAllOldRecordsToFile checks that displayAllOldRecords function
+// writes all old records into the output file.
+func TestDisplayAllOldRecordsToFile(t *testing.T) {
+	// prepare new mocked connection to database
+	connection, mock, err := sqlmock.New()
+	if err != nil {
+		t.Fatalf("an error '%s' was not expected when opening a stub database connection", err)
+	}
+
+	// prepare mocked result for SQL query
+	rows := sqlmock.NewRows([]string{"cluster", "reported_at", "last_checked"})
+	reportedAt := time.Date(2020, 1, 1, 0, 0, 0, 0, time.UTC)
+	updatedAt := time.Date(2020, 1, 2, 0, 0, 0, 0, time.UTC)
+	rows.AddRow("123e4567-e89b-12d3-a456-426614173998", reportedAt, updatedAt)
+
+	// expected query performed by tested function
+	expectedQuery := "SELECT cluster, reported_at, last_checked_at FROM report WHERE reported_at < NOW\\(\\) - \\$1::INTERVAL ORDER BY reported_at"
+	mock.ExpectQuery(expectedQuery).WillReturnRows(rows)
+	mock.ExpectClose()
+
+	// prepare output file
+	fout, err := ioutil.TempFile("", "old_records")
+	if err != nil {
+		t.Fatalf("unable to create temporary file: %v", err)
+	}
+	output := fout.Name()
+	defer func() {
+		_ = os.Remove(output)
+	}()
+	err = fout.Close()
+	if err != nil {
+		t.Fatalf("unable to close temporary file: %v", err)
+	}
+
+	// call the tested function
+	err = cleaner.DisplayAllOldRecords(connection, "10 days", output)
+	if err != nil {
+		t.Errorf("error was not expected while displaying old records: %s", err)
+	}
+
+	// check the file content (age of record depends on current time)
+	content, err := ioutil.ReadFile(output)
+	if err != nil {
+		t.Fatalf("unable to read output file: %v", err)
+	}
+	expectedPrefix := "123e4567-e89b-12d3-a456-426614173998,2020-01-01T00:00:00Z,2020-01-02T00:00:00Z,"
+	if !strings.HasPrefix(string(content), expectedPrefix) {
+		t.Errorf("wrong content of output file: '%s'", content)
+	}
+	if strings.Count(string(content), "\n") != 1 {
+		t.Errorf("one record is expected in output file: '%s'", content)
+	}
+
+	err = connection.Close()
+	if err != nil {
+		t.Fatalf("error during closing connection: %v", err)
+	}
+
+	// check if all expectations were met
+	err = mock.ExpectationsWereMet()
+	if err != nil {
+		t.Errorf("there were unfulfilled expectations: %s", err)
+	}
+}
+
 // TestDeleteRecordFromTable checks the basic behaviour of
 // deleteRecordFromTable function.
 func TestDeleteRecordFromTable(t *testing.T) {
@@ -32,5 +32,7 @@ var (
 	ReadOrgID                         = readOrgID
 	PerformDisplayMultipleRuleDisable = performDisplayMultipleRuleDisable
 	PerformListOfOldReports           = performListOfOldReports
+	DisplayAllOldRecords              = displayAllOldRecords
 	DeleteRecordFromTable             = deleteRecordFromTable
+	ServeCommands                     = serveCommands
 )
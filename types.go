@@ -43,3 +43,20 @@ type Summary struct {
 	ImproperClusterEntries int
 	DeletionsForTable      map[string]int
 }
+
+// Command represents one command read by the cleaner in server mode. Each
+// command is sent as JSON object on a separate line, for example:
+// {"op": "display", "max_age": "90 days", "output": "old_clusters.txt"}
+type Command struct {
+	Operation string `json:"op"`
+	MaxAge    string `json:"max_age"`
+	Clusters  string `json:"clusters"`
+	Output    string `json:"output"`
+}
+
+// Reply represents reply written by the cleaner in server mode after the
+// command has been performed
+type Reply struct {
+	Status string `json:"status"`
+	Error  string `json:"error,omitempty"`
+}